@@ -5,13 +5,18 @@
 # Author: Bryan Gwin
 
 import subprocess
-import torch
 
 
 def get_gpu_count():
     try:
-        result = subprocess.run(["nvidia-smi", "-L"], stdout=subprocess.PIPE)
-        gpu_count = len(result.stdout.decode().strip().split("\n"))
+        # Every line reports the total count, so only the first is needed
+        result = subprocess.run(
+            ["nvidia-smi", "--query-gpu=count", "--format=csv,noheader"],
+            stdout=subprocess.PIPE,
+            text=True,
+            check=True,
+        )
+        gpu_count = int(result.stdout.splitlines()[0])
         return gpu_count
     except Exception as e:
         print("Error occurred while getting GPU count:", e)
@@ -23,39 +28,63 @@ def main():
     global_device_count = get_gpu_count()
     print(f"Number of available GPUs: {global_device_count}")
 
-    # Get the number of GPUs being utilized by PyTorch
-    cuda_device_count = torch.cuda.device_count()
-    print(
-        f"Number of available GPUs being used by PyTorch: {cuda_device_count}"
-    )
-
     if global_device_count == 0:
         print(
             "No GPUs available. Make sure NVIDIA drivers are properly "
             "installed."
         )
         return
-    elif global_device_count != cuda_device_count:
+
+    # Importing torch is slow, so only pay for it once GPUs are present
+    import torch
+
+    # Exercise the TF32 tensor-core path that real workloads run on
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+
+    # Get the number of GPUs being utilized by PyTorch
+    cuda_device_count = torch.cuda.device_count()
+    print(
+        f"Number of available GPUs being used by PyTorch: {cuda_device_count}"
+    )
+
+    if global_device_count != cuda_device_count:
         print("Not all GPUs are being utilized by PyTorch.")
         return
 
     # Utilize all available GPUs
     print("Testing GPU utilization...")
-    for i in range(cuda_device_count):
-        device = torch.device(f"cuda:{i}")
-        print(f"Using GPU {i}: {torch.cuda.get_device_name(i)}")
-        # Run a simple computation on each GPU
-        with torch.cuda.device(device):
-            a = torch.randn(1000, 1000).cuda()
-            b = torch.randn(1000, 1000).cuda()
-            c = torch.matmul(a, b)
-            # Ensure the computation finished cleanly
-            try:
-                torch.cuda.synchronize()
-            except Exception as e:
-                print(f"Error occurred while utilizing GPU {i}: {e}")
-                print(f"GPU {i} is not being utilized correctly.")
-                return
+    # Queue the work on a dedicated stream per GPU so every device runs
+    # concurrently, then wait on each stream once at the end
+    streams = []
+    # No gradients are needed, so skip autograd bookkeeping entirely
+    with torch.inference_mode():
+        for i in range(cuda_device_count):
+            device = torch.device(f"cuda:{i}")
+            print(f"Using GPU {i}: {torch.cuda.get_device_name(i)}")
+            stream = torch.cuda.Stream(device=device)
+            streams.append(stream)
+            # Run a simple computation on each GPU
+            with torch.cuda.device(device), torch.cuda.stream(stream):
+                if i == 0:
+                    # Generate the inputs once and copy them to the others
+                    a = a0 = torch.randn(1000, 1000, device=device)
+                    b = b0 = torch.randn(1000, 1000, device=device)
+                else:
+                    # Wait for the inputs on GPU 0 before copying them over
+                    stream.wait_stream(streams[0])
+                    a = a0.to(device, non_blocking=True)
+                    b = b0.to(device, non_blocking=True)
+                c = torch.matmul(a, b)
+
+    # Ensure the computation finished cleanly
+    for i, stream in enumerate(streams):
+        try:
+            stream.synchronize()
+        except Exception as e:
+            print(f"Error occurred while utilizing GPU {i}: {e}")
+            print(f"GPU {i} is not being utilized correctly.")
+            return
 
     print("All GPUs are utilized.")
 